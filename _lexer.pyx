@@ -0,0 +1,145 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+#  Analizador léxico compilado de SentryData (opcional)
+#
+#  Compilar junto a sentrydata.py con:   cythonize -i _lexer.pyx
+#
+#  Recorre el código ASCII con un cursor sobre los bytes y solo crea objetos Python
+#  al emitir cada token. Reconoce exactamente el mismo lenguaje que el patrón maestro
+#  de SentryDataCompiler.lexical_analysis, que sigue siendo la referencia.
+
+import sys
+
+# ========== CLASES DE CARACTERES (ASCII) ==========
+
+cdef inline bint is_break(unsigned char c):
+    # Separadores de línea de str.splitlines: \n \v \f \r \x1c \x1d \x1e
+    return 10 <= c <= 13 or 28 <= c <= 30
+
+cdef inline bint is_blank(unsigned char c):
+    # Resto de espacios de str.isspace: espacio, \t y \x1f
+    return c == 32 or c == 9 or c == 31
+
+cdef inline int emit(list types, list values, list lines, list columns,
+                     str kind, object value, Py_ssize_t line, Py_ssize_t column) except -1:
+    types.append(kind)
+    values.append(value)
+    lines.append(line)
+    columns.append(column)
+    return 0
+
+cdef inline bint is_digit(unsigned char c):
+    return 48 <= c <= 57
+
+cdef inline bint is_ident_start(unsigned char c):
+    return 65 <= c <= 90 or 97 <= c <= 122 or c == 95
+
+cdef inline bint is_ident_char(unsigned char c):
+    return is_ident_start(c) or is_digit(c)
+
+# ========== ANÁLISIS LÉXICO ==========
+
+def tokenize(bytes code, keywords):
+    """Convierte código ASCII en tokens.
+
+    Devuelve (tipos, valores, líneas, columnas, errores, línea): las columnas paralelas
+    de los tokens, tuplas (línea, descripción) de errores léxicos y el número de la
+    última línea recorrida.
+    """
+    cdef const unsigned char* s = code
+    cdef Py_ssize_t n = len(code)
+    cdef Py_ssize_t i = 0, start, column, line = 1, line_start = 0
+    cdef unsigned char c, d
+    cdef bint at_line_start = True
+    cdef list types = [], values = [], lines = [], columns = []
+    cdef list errors = []
+
+    while True:
+        if at_line_start:
+            # Sangría y, si la hay, una línea de comentario
+            while i < n and is_blank(s[i]):
+                i += 1
+            line_start = i
+            if i + 1 < n and s[i] == 47 and s[i + 1] == 47:
+                while i < n and not is_break(s[i]):
+                    i += 1
+            at_line_start = False
+
+        while i < n and is_blank(s[i]):
+            i += 1
+        if i >= n:
+            break
+
+        c = s[i]
+        if is_break(c):
+            i += 2 if c == 13 and i + 1 < n and s[i + 1] == 10 else 1
+            line += 1
+            at_line_start = True
+            continue
+
+        start = i
+        column = start - line_start
+        i += 1
+
+        # NÚMEROS
+        if is_digit(c):
+            while i < n and is_digit(s[i]):
+                i += 1
+            if i < n and s[i] == 46:
+                i += 1
+                while i < n and is_digit(s[i]):
+                    i += 1
+            emit(types, values, lines, columns, "NUMBER", float(code[start:i]), line, column)
+
+        # STRINGS
+        elif c == 34:
+            while i < n and s[i] != 34 and not is_break(s[i]):
+                i += 1
+            if i < n and s[i] == 34:
+                emit(types, values, lines, columns, "STRING", code[start + 1:i].decode("ascii"), line, column)
+                i += 1
+            else:
+                errors.append((line, "Error 002: String sin cerrar"))
+
+        # IDENTIFICADORES / PALABRAS RESERVADAS
+        elif is_ident_start(c):
+            while i < n and is_ident_char(s[i]):
+                i += 1
+            text = code[start:i].decode("ascii")
+            upper = text.upper()
+            if upper in keywords:
+                emit(types, values, lines, columns, "KEYWORD", sys.intern(upper), line, column)
+            else:
+                emit(types, values, lines, columns, "IDENTIFIER", text, line, column)
+
+        # OPERADORES (2 caracteres primero)
+        else:
+            d = s[i] if i < n else 0
+            if d == 61 and c == 61:
+                emit(types, values, lines, columns, "OP_EQ", "==", line, column)
+                i += 1
+            elif d == 61 and c == 33:
+                emit(types, values, lines, columns, "OP_NEQ", "!=", line, column)
+                i += 1
+            elif d == 61 and c == 60:
+                emit(types, values, lines, columns, "OP_LTE", "<=", line, column)
+                i += 1
+            elif d == 61 and c == 62:
+                emit(types, values, lines, columns, "OP_GTE", ">=", line, column)
+                i += 1
+            elif c == 43:
+                emit(types, values, lines, columns, "OP_ADD", "+", line, column)
+            elif c == 45:
+                emit(types, values, lines, columns, "OP_SUB", "-", line, column)
+            elif c == 42:
+                emit(types, values, lines, columns, "OP_MUL", "*", line, column)
+            elif c == 47:
+                emit(types, values, lines, columns, "OP_DIV", "/", line, column)
+            elif c == 60:
+                emit(types, values, lines, columns, "OP_LT", "<", line, column)
+            elif c == 62:
+                emit(types, values, lines, columns, "OP_GT", ">", line, column)
+            else:
+                # CARÁCTER NO RECONOCIDO
+                errors.append((line, f"Error 001: Carácter no reconocido: '{chr(c)}'"))
+
+    return types, values, lines, columns, errors, line
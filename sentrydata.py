@@ -1,241 +1,699 @@
 #  Compilador SentryData 
 
 
-from dataclasses import dataclass
-from typing import List, Any, Dict
+import operator
+import re
+import sys
+from array import array
+from itertools import islice
+from typing import List, Any, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+try:  # Dependencia opcional: analizador léxico compilado (cythonize -i _lexer.pyx)
+    import _lexer
+except ImportError:
+    _lexer = None
 
 # ========== ESTRUCTURAS DE DATOS ==========
 
-@dataclass
-class Token:
+class Token(NamedTuple):
     """Token generado por el analizador léxico."""
     type: str
     value: Any
     line: int
     column: int
 
-@dataclass
-class SymbolTableEntry:
+class TokenStream:
+    """Flujo de tokens en columnas paralelas (tipo, valor, línea, columna).
+
+    Los Token individuales solo se reconstruyen al indexar o iterar el flujo
+    (p. ej. al imprimirlo); el léxico, el optimizador y la VM trabajan sobre las columnas.
+
+    Con capacity > 0 las columnas se reservan de antemano y append escribe en su sitio.
+    Solo las n primeras posiciones son tokens: toda lectura se detiene en n, y trim()
+    únicamente libera la capacidad que no llegó a usarse.
+    """
+    __slots__ = ("types", "values", "lines", "columns", "n")
+
+    def __init__(self, capacity: int = 0) -> None:
+        self.types: List[str] = [None] * capacity
+        self.values: List[Any] = [None] * capacity
+        self.lines = array("i", [0]) * capacity
+        self.columns = array("i", [0]) * capacity
+        self.n = 0
+
+    @classmethod
+    def from_columns(cls, types: List[str], values: List[Any],
+                     lines: List[int], columns: List[int]) -> "TokenStream":
+        stream = cls()
+        stream.types = types
+        stream.values = values
+        stream.lines = array("i", lines)
+        stream.columns = array("i", columns)
+        stream.n = len(types)
+        return stream
+
+    def append(self, type: str, value: Any, line: int, column: int) -> None:
+        i = self.n
+        if i < len(self.types):
+            self.types[i] = type
+            self.values[i] = value
+            self.lines[i] = line
+            self.columns[i] = column
+        else:  # sin capacidad reservada: las columnas crecen
+            self.types.append(type)
+            self.values.append(value)
+            self.lines.append(line)
+            self.columns.append(column)
+        self.n = i + 1
+
+    def truncate(self, n: int) -> None:
+        """Descarta los tokens a partir de la posición n."""
+        del self.types[n:], self.values[n:], self.lines[n:], self.columns[n:]
+        self.n = n
+
+    def trim(self) -> None:
+        """Descarta la capacidad reservada que no llegó a usarse."""
+        self.truncate(self.n)
+
+    def clear(self) -> None:
+        self.truncate(0)
+
+    def rows(self) -> Iterator[Tuple[str, Any, int, int]]:
+        """Recorre los tokens como tuplas simples, sin construir Token."""
+        # zip se detiene con la columna más corta: basta con acotar la primera
+        return zip(islice(self.types, self.n), self.values, self.lines, self.columns)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += self.n
+        if not 0 <= index < self.n:
+            raise IndexError("índice de token fuera de rango")
+        return Token(self.types[index], self.values[index], self.lines[index], self.columns[index])
+
+    def __iter__(self) -> Iterator[Token]:
+        return map(Token, islice(self.types, self.n), self.values, self.lines, self.columns)
+
+class SymbolTableEntry(NamedTuple):
     """Entrada en la tabla de símbolos."""
     name: str
     type: str
     value: Any
     line: int
 
-@dataclass
-class CompilerError:
+class CompilerError(NamedTuple):
     """Error del compilador."""
     line: int
     type: str  # 'LÉXICO', 'SINTÁCTICO', 'SEMÁNTICO', 'EJECUCIÓN'
     description: str
 
+class StackReplay:
+    """Reconstruye el estado de la pila a partir de un registro de ejecución.
+
+    Cada entrada del registro guarda solo su efecto ("popped" elementos retirados y el
+    valor "pushed" apilado, o None); la pila completa se materializa al iterar.
+    """
+
+    def __init__(self, execution_log: List[Dict]) -> None:
+        self.execution_log = execution_log
+
+    def __iter__(self) -> Iterator[Tuple[Dict, List[Any]]]:
+        stack: List[Any] = []
+        for entry in self.execution_log:
+            popped = entry["popped"]
+            if popped:
+                del stack[-popped:]
+            if entry["pushed"] is not None:
+                stack.append(entry["pushed"])
+            yield entry, list(stack)
+
+# ========== TIPOS DE TOKEN ==========
+
+# Etiquetas internadas: las comparaciones y búsquedas se resuelven por identidad
+_T_NUMBER = sys.intern("NUMBER")
+_T_STRING = sys.intern("STRING")
+_T_IDENTIFIER = sys.intern("IDENTIFIER")
+_T_KEYWORD = sys.intern("KEYWORD")
+_T_OP_ADD = sys.intern("OP_ADD")
+_T_OP_SUB = sys.intern("OP_SUB")
+_T_OP_MUL = sys.intern("OP_MUL")
+_T_OP_DIV = sys.intern("OP_DIV")
+_T_OP_EQ = sys.intern("OP_EQ")
+_T_OP_NEQ = sys.intern("OP_NEQ")
+_T_OP_LT = sys.intern("OP_LT")
+_T_OP_GT = sys.intern("OP_GT")
+_T_OP_LTE = sys.intern("OP_LTE")
+_T_OP_GTE = sys.intern("OP_GTE")
+
+_KW_AND = sys.intern("AND")
+_KW_OR = sys.intern("OR")
+_KW_NOT = sys.intern("NOT")
+
+# ========== OPERADORES ==========
+
+# Tipo de token -> (símbolo, función), aplicada como func(b, a) sobre los dos topes de pila
+_BINOPS = {
+    _T_OP_ADD: ("+", operator.add),
+    _T_OP_SUB: ("-", operator.sub),
+    _T_OP_MUL: ("*", operator.mul),
+    _T_OP_DIV: ("/", operator.truediv),
+    _T_OP_EQ: ("==", operator.eq),
+    _T_OP_NEQ: ("!=", operator.ne),
+    _T_OP_LT: ("<", operator.lt),
+    _T_OP_GT: (">", operator.gt),
+    _T_OP_LTE: ("<=", operator.le),
+    _T_OP_GTE: (">=", operator.ge),
+}
+
+# Literales que pueden plegarse en tiempo de compilación
+_FOLDABLE = frozenset({_T_NUMBER, _T_STRING})
+
+# Operadores que se pliegan: solo los aritméticos. Una comparación plegada dejaría un
+# bool como literal, que en la traza se vería igual que el identificador True/False
+_FOLDABLE_OPS = frozenset({_T_OP_ADD, _T_OP_SUB, _T_OP_MUL, _T_OP_DIV})
+
+def _logical_and(b: Any, a: Any) -> bool:
+    return bool(b) and bool(a)
+
+def _logical_or(b: Any, a: Any) -> bool:
+    return bool(b) or bool(a)
+
+# ========== BYTECODE ==========
+
+OP_PUSH_NUM = 0
+OP_PUSH_STR = 1
+OP_PUSH_ID = 2
+OP_ADD = 3
+OP_SUB = 4
+OP_MUL = 5
+OP_DIV = 6
+OP_EQ = 7
+OP_NEQ = 8
+OP_LT = 9
+OP_GT = 10
+OP_LTE = 11
+OP_GTE = 12
+OP_AND = 13
+OP_OR = 14
+OP_NOT = 15
+OP_KEYWORD = 16  # palabra reservada sin implementar
+OP_IGNORE = 17   # tipo de token sin instrucción asociada
+
+# Tipo de token -> opcode
+_TOKEN_OPCODES = {
+    _T_NUMBER: OP_PUSH_NUM,
+    _T_STRING: OP_PUSH_STR,
+    _T_IDENTIFIER: OP_PUSH_ID,
+    _T_OP_ADD: OP_ADD,
+    _T_OP_SUB: OP_SUB,
+    _T_OP_MUL: OP_MUL,
+    _T_OP_DIV: OP_DIV,
+    _T_OP_EQ: OP_EQ,
+    _T_OP_NEQ: OP_NEQ,
+    _T_OP_LT: OP_LT,
+    _T_OP_GT: OP_GT,
+    _T_OP_LTE: OP_LTE,
+    _T_OP_GTE: OP_GTE,
+    _T_KEYWORD: OP_KEYWORD,
+}
+
+# Opcode -> (elementos que desapila, elementos que apila)
+_STACK_EFFECT = [
+    (0, 1), (0, 1), (0, 1),          # OP_PUSH_NUM, OP_PUSH_STR, OP_PUSH_ID
+    *[(2, 1)] * (OP_NOT - OP_ADD),   # OP_ADD .. OP_OR
+    (1, 1),                          # OP_NOT
+    (0, 0), (0, 0),                  # OP_KEYWORD, OP_IGNORE
+]
+
+# Palabra reservada -> (opcode, operando)
+_KEYWORD_OPCODES = {
+    _KW_AND: (OP_AND, ("AND", _logical_and)),
+    _KW_OR: (OP_OR, ("OR", _logical_or)),
+    _KW_NOT: (OP_NOT, None),
+}
+
+# ========== NÚCLEO NUMÉRICO ==========
+
+# Instrucciones que admite el núcleo: programas de números y aritmética pura
+_NUMERIC_OPCODES = frozenset({OP_PUSH_NUM, OP_ADD, OP_SUB, OP_MUL, OP_DIV})
+
+def _run_numeric(opcodes, imms, stack):
+    """Ejecuta un programa numérico sobre un búfer de floats sin boxing (array('d') o,
+    compilado con numba, un array de numpy); devuelve la altura final de la pila, o -1
+    ante underflow o división por cero (casos que resuelve la VM general)."""
+    sp = 0
+    for pc in range(len(opcodes)):
+        op = opcodes[pc]
+        if op == OP_PUSH_NUM:
+            stack[sp] = imms[pc]
+            sp += 1
+            continue
+        if sp < 2:
+            return -1
+        sp -= 1
+        a = stack[sp]
+        b = stack[sp - 1]
+        if op == OP_ADD:
+            stack[sp - 1] = b + a
+        elif op == OP_SUB:
+            stack[sp - 1] = b - a
+        elif op == OP_MUL:
+            stack[sp - 1] = b * a
+        else:
+            if a == 0.0:
+                return -1
+            stack[sp - 1] = b / a
+    return sp
+
+# (numpy, núcleo compilado) tras la primera carga; False si numba no está disponible
+_numeric_jit = None
+
+def _load_numeric_jit():
+    """Dependencia opcional: importa numpy y numba y compila el núcleo en el primer uso,
+    de modo que solo lo paga quien ejecuta sin traza; devuelve None si no están."""
+    global _numeric_jit
+    if _numeric_jit is None:
+        try:
+            import numpy as np
+            from numba import njit
+        except ImportError:
+            _numeric_jit = False
+        else:
+            _numeric_jit = (np, njit(cache=True)(_run_numeric))
+    return _numeric_jit or None
+
+def _run_numeric_jit(opcodes: array, imms: array, max_depth: int):
+    """Ejecuta el núcleo compilado; devuelve (pila, altura), o None si numba no está
+    disponible o falla (p. ej. al cargar su caché en disco) y hay que usar _run_numeric."""
+    global _numeric_jit
+    jit = _load_numeric_jit()
+    if jit is None:
+        return None
+    np, kernel = jit
+    stack = np.empty(max_depth)
+    try:
+        return stack, kernel(np.frombuffer(opcodes, dtype=np.uint8), np.frombuffer(imms), stack)
+    except Exception:
+        _numeric_jit = False  # no se reintenta en esta sesión
+        return None
+
 # ========== COMPILADOR ==========
 
 class SentryDataCompiler:
     def __init__(self) -> None:
-        self.tokens: List[Token] = []
+        self.tokens: TokenStream = TokenStream()
         self.symbol_table: Dict[str, SymbolTableEntry] = {}
         self.errors: List[CompilerError] = []
         self.stack: List[Any] = []
         self.current_line: int = 1
+        self._lines: array = array("i")  # línea de cada instrucción, para reportar errores
+
+    def reset(self) -> None:
+        """Reinicia el estado para compilar otro programa con la misma instancia.
+
+        Solo toca lo que las fases no reasignan por sí mismas: tokens y errores los crea
+        el léxico, y pila y líneas la VM, en cada pasada.
+        """
+        self.symbol_table.clear()  # get_symbol_table entrega copias: vaciarla es seguro
+        self.current_line = 1
 
     # FASE 1: ANÁLISIS LÉXICO
-    def lexical_analysis(self, code: str) -> List[Token]:
-        """Convierte código fuente en tokens."""
-        self.tokens = []
-        self.errors = []
-        lines = code.splitlines()
 
-        for line_index, raw_line in enumerate(lines):
-            self.current_line = line_index + 1
-            line = raw_line.strip()
+    _KEYWORDS = frozenset({
+        "AND", "OR", "NOT", "IF", "THEN", "ELSE", "ENDIF",
+        "DELETE", "MODIFY", "EXTRACT", "FILTER", "LOAD", "SAVE",
+        "DUP", "DROP", "SWAP", "PRINT"
+    })
+
+    # Tipo de token -> lexema; los de 2 caracteres van primero para tener prioridad
+    _OPERATORS = {
+        _T_OP_EQ: "==", _T_OP_NEQ: "!=", _T_OP_LTE: "<=", _T_OP_GTE: ">=",
+        _T_OP_ADD: "+", _T_OP_SUB: "-", _T_OP_MUL: "*", _T_OP_DIV: "/",
+        _T_OP_LT: "<", _T_OP_GT: ">"
+    }
+    # Grupo del patrón -> (tipo internado, lexema); los nombres de grupo de re no están internados
+    _OPERATOR_TOKENS = {kind: (kind, lexeme) for kind, lexeme in _OPERATORS.items()}
+
+    # Separadores de línea (los mismos que reconoce str.splitlines)
+    _LINE_BREAKS = ("\n", "\r", "\v", "\f", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+    _BREAK = r"\n\r\v\f\x1c-\x1e\x85\u2028\u2029"  # los mismos, como clase de caracteres
+
+    # Numéricos de \w que no son letras ni dígitos decimales (\d): '²', '¼', 'Ⅻ'...
+    # Como en el escáner original, no pueden abrir un identificador. Rangos precalculados
+    # (Unicode 14.0, Python 3.11) para no recorrer todos los code points al importar:
+    #   [c for c in map(chr, range(sys.maxunicode + 1))
+    #    if c.isalnum() and not c.isalpha() and not c.isdecimal()]
+    _NUMERIC_NOT_DIGIT = (
+        r'\u00b2-\u00b3\u00b9\u00bc-\u00be\u09f4-\u09f9\u0b72-\u0b77\u0bf0-\u0bf2\u0c78-\u0c7e'
+        r'\u0d58-\u0d5e\u0d70-\u0d78\u0f2a-\u0f33\u1369-\u137c\u16ee-\u16f0\u17f0-\u17f9\u19da'
+        r'\u2070\u2074-\u2079\u2080-\u2089\u2150-\u2182\u2185-\u2189\u2460-\u249b\u24ea-\u24ff'
+        r'\u2776-\u2793\u2cfd\u3007\u3021-\u3029\u3038-\u303a\u3192-\u3195\u3220-\u3229'
+        r'\u3248-\u324f\u3251-\u325f\u3280-\u3289\u32b1-\u32bf\ua6e6-\ua6ef\ua830-\ua835'
+        r'\U00010107-\U00010133\U00010140-\U00010178\U0001018a-\U0001018b\U000102e1-\U000102fb'
+        r'\U00010320-\U00010323\U00010341\U0001034a\U000103d1-\U000103d5\U00010858-\U0001085f'
+        r'\U00010879-\U0001087f\U000108a7-\U000108af\U000108fb-\U000108ff\U00010916-\U0001091b'
+        r'\U000109bc-\U000109bd\U000109c0-\U000109cf\U000109d2-\U000109ff\U00010a40-\U00010a48'
+        r'\U00010a7d-\U00010a7e\U00010a9d-\U00010a9f\U00010aeb-\U00010aef\U00010b58-\U00010b5f'
+        r'\U00010b78-\U00010b7f\U00010ba9-\U00010baf\U00010cfa-\U00010cff\U00010e60-\U00010e7e'
+        r'\U00010f1d-\U00010f26\U00010f51-\U00010f54\U00010fc5-\U00010fcb\U00011052-\U00011065'
+        r'\U000111e1-\U000111f4\U0001173a-\U0001173b\U000118ea-\U000118f2\U00011c5a-\U00011c6c'
+        r'\U00011fc0-\U00011fd4\U00012400-\U0001246e\U00016b5b-\U00016b61\U00016e80-\U00016e96'
+        r'\U0001d2e0-\U0001d2f3\U0001d360-\U0001d378\U0001e8c7-\U0001e8cf\U0001ec71-\U0001ecab'
+        r'\U0001ecad-\U0001ecaf\U0001ecb1-\U0001ecb4\U0001ed01-\U0001ed2d\U0001ed2f-\U0001ed3d'
+        r'\U0001f100-\U0001f10c'
+    )
+
+    # Patrón maestro: un único autómata compilado (sre) recorre todo el código fuente.
+    # BOL/NL consumen el inicio de cada línea: la sangría y, si la hay, una línea de comentario;
+    # el resto de espacios se descarta como prefijo de cada lexema, sin coincidencia propia.
+    # Cada operador tiene su propio grupo, cuyo nombre es directamente el tipo de token.
+    _TOKEN_RE = re.compile(
+        rf'(?P<BOL>\A[^\S{_BREAK}]*(?://[^{_BREAK}]*)?)'
+        rf'|[^\S{_BREAK}]*(?:'
+        rf'(?P<NL>(?:\r\n|[{_BREAK}])[^\S{_BREAK}]*(?://[^{_BREAK}]*)?)'
+        r'|(?P<NUMBER>\d+(?:\.\d*)?)'
+        rf'|(?P<STRING>"[^"{_BREAK}]*"?)'
+        rf'|(?P<IDENT>[^\W\d{_NUMERIC_NOT_DIGIT}]\w*)'
+        + "".join(f"|(?P<{kind}>{re.escape(lexeme)})" for kind, lexeme in _OPERATORS.items())
+        + r'|(?P<ERR>\S))',
+        re.DOTALL,
+    )
+
+    def lexical_analysis(self, code: str) -> TokenStream:
+        """Convierte código fuente en tokens."""
+        if _lexer is not None and code.isascii():
+            return self._compiled_lexical_analysis(code)
 
-            # Ignorar líneas vacías y comentarios
-            if not line or line.startswith("//"):
+        # Cada token consume al menos un carácter: len(code) es una cota segura
+        self.tokens = TokenStream(len(code))
+        self.errors = []
+        handlers = self._LEX_HANDLERS
+        line = 1
+        line_start = 0  # posición de la columna 0 de la línea actual (tras la sangría)
+
+        for m in self._TOKEN_RE.finditer(code):
+            kind = m.lastgroup
+            if kind == "NL":
+                line += 1
+                line_start = m.end()
                 continue
+            if kind == "BOL":
+                line_start = m.end()
+                continue
+            start, end = m.span(kind)
+            handler = handlers[kind]
+            handler(self, kind, code, start, end, line, start - line_start)
 
-            column = 0
-            i = 0
-            while i < len(line):
-                ch = line[i]
-
-                # Espacios
-                if ch.isspace():
-                    i += 1
-                    column += 1
-                    continue
-
-                # NÚMEROS
-                if ch.isdigit():
-                    start_col = column
-                    num = ""
-                    while i < len(line) and (line[i].isdigit() or line[i] == "."):
-                        num += line[i]
-                        i += 1
-                        column += 1
-                    self.tokens.append(Token("NUMBER", float(num), self.current_line, start_col))
-                    continue
-
-                # STRINGS
-                if ch == '"':
-                    start_col = column
-                    i += 1
-                    column += 1
-                    value = ""
-                    while i < len(line) and line[i] != '"':
-                        value += line[i]
-                        i += 1
-                        column += 1
-                    if i < len(line) and line[i] == '"':
-                        i += 1
-                        column += 1
-                        self.tokens.append(Token("STRING", value, self.current_line, start_col))
-                    else:
-                        self.errors.append(
-                            CompilerError(self.current_line, "LÉXICO", "Error 002: String sin cerrar")
-                        )
-                    continue
-
-                # IDENTIFICADORES / PALABRAS RESERVADAS
-                if ch.isalpha() or ch == "_":
-                    start_col = column
-                    ident = ""
-                    while i < len(line) and (line[i].isalnum() or line[i] == "_"):
-                        ident += line[i]
-                        i += 1
-                        column += 1
-
-                    keywords = {
-                        "AND", "OR", "NOT", "IF", "THEN", "ELSE", "ENDIF",
-                        "DELETE", "MODIFY", "EXTRACT", "FILTER", "LOAD", "SAVE",
-                        "DUP", "DROP", "SWAP", "PRINT"
-                    }
-                    upper = ident.upper()
-                    if upper in keywords:
-                        self.tokens.append(Token("KEYWORD", upper, self.current_line, start_col))
-                    else:
-                        self.tokens.append(Token("IDENTIFIER", ident, self.current_line, start_col))
-                    continue
-
-                # OPERADORES (2 caracteres primero)
-                operators = {
-                    "==": "OP_EQ", "!=": "OP_NEQ", "<=": "OP_LTE", ">=": "OP_GTE",
-                    "+": "OP_ADD", "-": "OP_SUB", "*": "OP_MUL", "/": "OP_DIV",
-                    "<": "OP_LT", ">": "OP_GT"
-                }
-
-                # Operadores de 2 caracteres
-                if i + 1 < len(line):
-                    two = line[i:i+2]
-                    if two in operators:
-                        self.tokens.append(Token(operators[two], two, self.current_line, column))
-                        i += 2
-                        column += 2
-                        continue
-
-                # Operadores de 1 carácter
-                if ch in operators:
-                    self.tokens.append(Token(operators[ch], ch, self.current_line, column))
-                    i += 1
-                    column += 1
-                    continue
-
-                # CARÁCTER NO RECONOCIDO
-                self.errors.append(
-                    CompilerError(self.current_line, "LÉXICO", f"Error 001: Carácter no reconocido: '{ch}'")
-                )
-                i += 1
-                column += 1
+        self.tokens.trim()
+        if code:
+            self.current_line = line - 1 if code.endswith(self._LINE_BREAKS) else line
+        return self.tokens
 
+    def _compiled_lexical_analysis(self, code: str) -> TokenStream:
+        """Análisis léxico con la extensión _lexer (solo código ASCII)."""
+        types, values, lines, columns, errors, line = _lexer.tokenize(code.encode("ascii"), self._KEYWORDS)
+        self.tokens = TokenStream.from_columns(types, values, lines, columns)
+        self.errors = [CompilerError(err_line, "LÉXICO", description) for err_line, description in errors]
+        if code:
+            self.current_line = line - 1 if code.endswith(self._LINE_BREAKS) else line
         return self.tokens
 
+    # Cada manejador recibe el grupo reconocido, el búfer y los límites del lexema,
+    # y toma a lo sumo un único slice
+
+    def _lex_number(self, kind: str, src: str, start: int, end: int, line: int, column: int) -> None:
+        self.tokens.append(_T_NUMBER, float(src[start:end]), line, column)
+
+    def _lex_string(self, kind: str, src: str, start: int, end: int, line: int, column: int) -> None:
+        if end - start > 1 and src[end - 1] == '"':
+            self.tokens.append(_T_STRING, src[start + 1:end - 1], line, column)
+        else:
+            self.errors.append(CompilerError(line, "LÉXICO", "Error 002: String sin cerrar"))
+
+    def _lex_ident(self, kind: str, src: str, start: int, end: int, line: int, column: int) -> None:
+        text = src[start:end]
+        upper = text.upper()
+        if upper in self._KEYWORDS:
+            self.tokens.append(_T_KEYWORD, sys.intern(upper), line, column)
+        else:
+            self.tokens.append(_T_IDENTIFIER, text, line, column)
+
+    def _lex_operator(self, kind: str, src: str, start: int, end: int, line: int, column: int) -> None:
+        ttype, lexeme = self._OPERATOR_TOKENS[kind]
+        self.tokens.append(ttype, lexeme, line, column)
+
+    def _lex_error(self, kind: str, src: str, start: int, end: int, line: int, column: int) -> None:
+        self.errors.append(
+            CompilerError(line, "LÉXICO", f"Error 001: Carácter no reconocido: '{src[start]}'")
+        )
+
+    # Grupo del patrón maestro -> manejador
+    _LEX_HANDLERS = {
+        "NUMBER": _lex_number,
+        "STRING": _lex_string,
+        "IDENT": _lex_ident,
+        **dict.fromkeys(_OPERATORS, _lex_operator),
+        "ERR": _lex_error,
+    }
+
+    # OPTIMIZACIÓN: PLEGADO DE CONSTANTES
+    def peephole(self, tokens: TokenStream) -> TokenStream:
+        """Pliega cada secuencia literal, literal, operador binario en un único literal."""
+        # El plegado nunca alarga el flujo: basta con la capacidad de la entrada
+        folded = TokenStream(len(tokens))
+        types, values, lines, columns = folded.types, folded.values, folded.lines, folded.columns
+        n = 0
+        for t, value, line, column in tokens.rows():
+            types[n] = t
+            values[n] = value
+            lines[n] = line
+            columns[n] = column
+            n += 1
+            # En RPN el patrón es local y solo puede completarse al llegar un operador:
+            # comprobarlo tras cada token añadido deja el resultado en punto fijo en una pasada
+            if (n >= 3 and types[n - 1] in _FOLDABLE_OPS
+                    and types[n - 2] in _FOLDABLE and types[n - 3] in _FOLDABLE):
+                try:
+                    value = _BINOPS[types[n - 1]][1](values[n - 3], values[n - 2])
+                except (ArithmeticError, TypeError):
+                    pass  # p. ej. división por cero: el error se reporta al ejecutar
+                else:
+                    # El literal resultante conserva la posición del primer operando
+                    n -= 2
+                    types[n - 1] = _T_STRING if isinstance(value, str) else _T_NUMBER
+                    values[n - 1] = value
+        folded.truncate(n)
+        return folded
+
+    # COMPILACIÓN A BYTECODE
+    def compile_tokens(self, tokens: TokenStream) -> Tuple[array, list, array]:
+        """Traduce los tokens a bytecode plano: opcodes, operandos y líneas (solo para errores)."""
+        opcodes = array("B")
+        operands: list = []
+
+        for t, value in zip(islice(tokens.types, tokens.n), tokens.values):
+            op = _TOKEN_OPCODES.get(t, OP_IGNORE)
+            if op <= OP_PUSH_ID:
+                operand = value
+            elif op == OP_KEYWORD:
+                # El análisis léxico ya entrega las palabras reservadas en mayúsculas e internadas
+                assert value.isupper(), value
+                op, operand = _KEYWORD_OPCODES.get(value, (OP_KEYWORD, value))
+            elif op == OP_IGNORE:
+                operand = t
+            else:
+                operand = _BINOPS[t]
+            opcodes.append(op)
+            operands.append(operand)
+
+        # La columna de líneas del flujo ya es la tabla lateral de errores
+        return opcodes, operands, tokens.lines
+
     # MÁQUINA VIRTUAL DE PILA (Forth)
-    def execute_stack_machine(self, tokens: List[Token]) -> List[Dict]:
-        """Ejecuta tokens en máquina de pila."""
-        self.stack = []
-        execution_log: List[Dict] = []
-
-        for index, token in enumerate(tokens):
-            action = self.process_token(token)
-            execution_log.append({
-                "step": index + 1,
-                "token": token,
+    def execute_stack_machine(self, tokens: TokenStream, trace: bool = True) -> List[Dict]:
+        """Ejecuta tokens en máquina de pila; con trace=False no se genera el registro de pasos."""
+        opcodes, operands, self._lines = self.compile_tokens(tokens)
+        # Programas solo numéricos: pila de floats sin boxing, con o sin traza
+        numeric = self._numeric_prepass(opcodes, operands)
+        if numeric is not None:
+            if not trace:
+                if self._run_numeric_kernel(opcodes, *numeric):
+                    return []
+            else:
+                execution_log = self._trace_numeric(tokens, opcodes, operands, *numeric)
+                if execution_log is not None:
+                    return execution_log
+
+        self.stack = stack = []
+        push = stack.append
+        handlers = self._OPCODE_HANDLERS
+        # Una entrada por instrucción: el registro se reserva entero de antemano
+        execution_log: List[Dict] = [None] * len(opcodes) if trace else []
+
+        for pc in range(len(opcodes)):
+            op = opcodes[pc]
+            # Los literales (la mayoría de instrucciones) se apilan aquí mismo, sin despacho
+            if op == OP_PUSH_NUM or op == OP_PUSH_ID:
+                value = operands[pc]
+                push(value)
+                action = f"PUSH {value}"
+                popped = 0
+            elif op == OP_PUSH_STR:
+                value = operands[pc]
+                push(value)
+                action = f'PUSH "{value}"'
+                popped = 0
+            else:
+                depth = len(stack)
+                action = handlers[op](self, operands[pc], pc)
+                # Efecto sobre la pila; si faltaban operandos la instrucción no la tocó
+                pops, pushes = _STACK_EFFECT[op]
+                if pushes and depth >= pops:
+                    popped, value = pops, stack[-1]
+                else:
+                    popped, value = 0, None
+            if trace:
+                execution_log[pc] = {
+                    "step": pc + 1,
+                    "token": tokens[pc],
+                    "action": action,
+                    "pushed": value,
+                    "popped": popped,
+                }
+
+        return execution_log
+
+    def _numeric_prepass(self, opcodes: array, operands: list):
+        """Si el programa es solo numérico, devuelve sus inmediatos sin boxing y la
+        profundidad máxima de la pila; None si no aplica y hay que usar la VM general."""
+        if not opcodes or not _NUMERIC_OPCODES.issuperset(opcodes):
+            return None
+
+        imms = array("d", [0.0]) * len(opcodes)
+        depth = max_depth = 0
+        for pc, value in enumerate(operands):
+            if opcodes[pc] == OP_PUSH_NUM:
+                if type(value) is not float:
+                    return None
+                imms[pc] = value
+                depth += 1
+                if depth > max_depth:
+                    max_depth = depth
+            else:
+                depth -= 1
+                if depth < 1:
+                    return None  # underflow: lo reporta la VM general
+        return imms, max_depth
+
+    def _run_numeric_kernel(self, opcodes: array, imms: array, max_depth: int) -> bool:
+        """Ejecuta sin traza con el núcleo numérico (JIT si numba está disponible).
+        Devuelve False si hay que repetir en la VM general (división por cero)."""
+        result = _run_numeric_jit(opcodes, imms, max_depth)
+        if result is not None:
+            stack, sp = result
+        else:
+            stack = array("d", [0.0]) * max_depth
+            sp = _run_numeric(opcodes, imms, stack)
+        if sp < 0:
+            return False
+        self.stack = stack[:sp].tolist()
+        return True
+
+    def _trace_numeric(self, tokens: TokenStream, opcodes: array, operands: list,
+                       imms: array, max_depth: int):
+        """Ejecuta con traza un programa numérico sobre un búfer array('d') con puntero sp.
+        Devuelve el registro de pasos, o None si hay que repetir en la VM general."""
+        buf = array("d", [0.0]) * max_depth
+        sp = 0
+        execution_log: List[Dict] = [None] * len(opcodes)
+
+        for pc in range(len(opcodes)):
+            op = opcodes[pc]
+            if op == OP_PUSH_NUM:
+                value = imms[pc]
+                buf[sp] = value
+                sp += 1
+                action = f"PUSH {value}"
+                popped = 0
+            else:
+                # La pre-pasada garantiza al menos dos operandos
+                sp -= 1
+                a = buf[sp]
+                b = buf[sp - 1]
+                if op == OP_ADD:
+                    value = b + a
+                elif op == OP_SUB:
+                    value = b - a
+                elif op == OP_MUL:
+                    value = b * a
+                elif a == 0.0:
+                    return None  # división por cero: la VM general la reporta
+                else:
+                    value = b / a
+                buf[sp - 1] = value
+                name = operands[pc][0]
+                action = f"{name}: {b} {name} {a} = {value}"
+                popped = 2
+            execution_log[pc] = {
+                "step": pc + 1,
+                "token": tokens[pc],
                 "action": action,
-                "stack_state": list(self.stack),
-            })
+                "pushed": value,
+                "popped": popped,
+            }
 
+        self.stack = buf[:sp].tolist()
         return execution_log
 
-    def process_token(self, token: Token) -> str:
-        """Procesa token individual."""
-        t = token.type
-
-        if t == "NUMBER":
-            self.stack.append(token.value)
-            return f"PUSH {token.value}"
-        if t == "STRING":
-            self.stack.append(token.value)
-            return f'PUSH "{token.value}"'
-        if t == "IDENTIFIER":
-            self.stack.append(token.value)
-            return f"PUSH {token.value}"
-
-        # ARITMÉTICAS
-        if t == "OP_ADD":
-            return self.execute_bin_op("+", lambda a, b: b + a)
-        if t == "OP_SUB":
-            return self.execute_bin_op("-", lambda a, b: b - a)
-        if t == "OP_MUL":
-            return self.execute_bin_op("*", lambda a, b: b * a)
-        if t == "OP_DIV":
-            return self.execute_bin_op("/", lambda a, b: b / a)
-
-        # COMPARACIONES
-        if t == "OP_EQ":
-            return self.execute_bin_op("==", lambda a, b: b == a)
-        if t == "OP_NEQ":
-            return self.execute_bin_op("!=", lambda a, b: b != a)
-        if t == "OP_LT":
-            return self.execute_bin_op("<", lambda a, b: b < a)
-        if t == "OP_GT":
-            return self.execute_bin_op(">", lambda a, b: b > a)
-        if t == "OP_LTE":
-            return self.execute_bin_op("<=", lambda a, b: b <= a)
-        if t == "OP_GTE":
-            return self.execute_bin_op(">=", lambda a, b: b >= a)
-
-        # LÓGICAS
-        if t == "KEYWORD":
-            kw = token.value.upper()
-            if kw == "AND":
-                return self.execute_bin_op("AND", lambda a, b: bool(b) and bool(a))
-            if kw == "OR":
-                return self.execute_bin_op("OR", lambda a, b: bool(b) or bool(a))
-            if kw == "NOT":
-                if len(self.stack) < 1:
-                    self.errors.append(
-                        CompilerError(token.line, "EJECUCIÓN", "Stack underflow: NOT requiere 1 operando")
-                    )
-                    return "ERROR: Stack underflow en NOT"
-                a = self.stack.pop()
-                result = not bool(a)
-                self.stack.append(result)
-                return f"NOT: !{a} = {result}"
-            return f"KEYWORD {kw} (sin implementar)"
-        
+    # ARITMÉTICAS, COMPARACIONES Y LÓGICAS BINARIAS
+    def _op_binop(self, binop: Tuple[str, Callable], pc: int) -> str:
+        name, func = binop
+        return self.execute_bin_op(name, func, pc)
+
+    def _op_not(self, _: Any, pc: int) -> str:
+        if len(self.stack) < 1:
+            self.errors.append(
+                CompilerError(self._lines[pc], "EJECUCIÓN", "Stack underflow: NOT requiere 1 operando")
+            )
+            return "ERROR: Stack underflow en NOT"
+        a = self.stack.pop()
+        result = not bool(a)
+        self.stack.append(result)
+        return f"NOT: !{a} = {result}"
+
+    def _op_keyword(self, kw: str, pc: int) -> str:
+        return f"KEYWORD {kw} (sin implementar)"
+
+    def _op_ignore(self, t: str, pc: int) -> str:
         return f"IGNORADO {t}"
 
-    def execute_bin_op(self, op_name: str, func) -> str:
-        """Ejecuta operación binaria."""
+    # Tabla de despacho indexada por opcode; los literales se apilan en la propia VM
+    _OPCODE_HANDLERS = [
+        None, None, None,                   # OP_PUSH_NUM, OP_PUSH_STR, OP_PUSH_ID
+        *[_op_binop] * (OP_NOT - OP_ADD),   # OP_ADD .. OP_OR
+        _op_not,                            # OP_NOT
+        _op_keyword,                        # OP_KEYWORD
+        _op_ignore,                         # OP_IGNORE
+    ]
+
+    def execute_bin_op(self, op_name: str, func: Callable, pc: Optional[int] = None) -> str:
+        """Ejecuta operación binaria; pc, si se indica, ubica la línea de los errores.
+
+        func se llama como func(b, a): b es el operando más profundo y a el tope de la pila.
+        Antes se llamaba func(a, b), así que un callback externo recibe ahora el orden inverso.
+        """
         if len(self.stack) < 2:
+            line = self._lines[pc] if pc is not None else self.current_line
             self.errors.append(
-                CompilerError(self.current_line, "EJECUCIÓN", f"Stack underflow: {op_name} requiere 2 operandos")
+                CompilerError(line, "EJECUCIÓN", f"Stack underflow: {op_name} requiere 2 operandos")
             )
             return f"ERROR: Stack underflow en {op_name}"
 
         a = self.stack.pop()
         b = self.stack.pop()
-        result = func(a, b)
+        result = func(b, a)
         self.stack.append(result)
         return f"{op_name}: {b} {op_name} {a} = {result}"
 
@@ -265,73 +723,80 @@ def main():
     print("Escribe 'salir' para terminar.")
     print("=" * 60)
 
+    compiler = SentryDataCompiler()
+
     while True:
+        # La salida de cada turno se acumula y se escribe de una vez
+        buf: List[str] = []
+        out = buf.append
         try:
             src = input("\nSentryData> ")
             if src.strip().lower() in ("salir", "exit", "quit"):
-                print("¡Gracias por probarlo!")
+                out("¡Gracias por probarlo!")
                 break
 
             if not src.strip():
                 continue
 
-            compiler = SentryDataCompiler()
+            compiler.reset()
 
             # LÉXICO
             tokens = compiler.lexical_analysis(src)
 
-            print("\n" + "="*40)
-            print("ANÁLISIS LÉXICO")
-            print("="*40)
+            out("\n" + "="*40)
+            out("ANÁLISIS LÉXICO")
+            out("="*40)
             if not tokens:
-                print("Ningún token generado")
+                out("Ningún token generado")
             else:
                 for i, t in enumerate(tokens, start=1):
-                    print(f"{i:02d}. {t.type:<12} '{t.value}'  L{t.line}:C{t.column}")
+                    out(f"{i:02d}. {t.type:<12} '{t.value}'  L{t.line}:C{t.column}")
 
             # FASE 2: EJECUCIÓN
-            exec_log = compiler.execute_stack_machine(tokens)
+            exec_log = compiler.execute_stack_machine(compiler.peephole(tokens))
 
-            print("\n" + "="*40)
-            print("MÁQUINA VIRTUAL DE PILA")
-            print("="*40)
+            out("\n" + "="*40)
+            out("MÁQUINA VIRTUAL DE PILA")
+            out("="*40)
             if not exec_log:
-                print("No se ejecutó nada")
+                out("No se ejecutó nada")
             else:
-                for entry in exec_log:
+                for entry, stack_state in StackReplay(exec_log):
                     step = entry["step"]
                     action = entry["action"]
-                    stack_state = entry["stack_state"]
-                    print(f"P{step:02d}: {action:<40} → {stack_state}")
+                    out(f"P{step:02d}: {action:<40} → {stack_state}")
 
             # RESULTADO FINAL
-            print("\n" + "="*40)
-            print("RESULTADO FINAL")
-            print("="*40)
+            out("\n" + "="*40)
+            out("RESULTADO FINAL")
+            out("="*40)
             stack = compiler.get_stack()
             if stack:
-                print(f"Pila: {stack}")
+                out(f"Pila: {stack}")
                 if len(stack) == 1:
-                    print(f"RESULTADO: {stack[0]}")
+                    out(f"RESULTADO: {stack[0]}")
             else:
-                print("Pila vacía")
+                out("Pila vacía")
 
             # ERRORES
-            print("\n" + "="*40)
-            print("⚠️  ERRORES DETECTADOS")
-            print("="*40)
+            out("\n" + "="*40)
+            out("⚠️  ERRORES DETECTADOS")
+            out("="*40)
             errors = compiler.get_errors()
             if not errors:
-                print("Sin errores")
+                out("Sin errores")
             else:
                 for e in errors:
-                    print(f"❌ L{e.line:2d} [{e.type:<10}] {e.description}")
+                    out(f"❌ L{e.line:2d} [{e.type:<10}] {e.description}")
 
         except KeyboardInterrupt:
-            print("\n\n¡Gracias por probarme!")
+            out("\n\n¡Gracias por probarme!")
             break
         except Exception as e:
-            print(f"\n❌ Error inesperado: {e}")
+            out(f"\n❌ Error inesperado: {e}")
+        finally:
+            if buf:
+                sys.stdout.write("\n".join(buf) + "\n")
 
 if __name__ == "__main__":
     main()